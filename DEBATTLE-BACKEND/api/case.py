@@ -1,12 +1,24 @@
 
+import os
 import sys
 import random
-import time
+import re
 import json
-from typing import List, Dict, Callable
+import time
+import asyncio
+import sqlite3
+import hashlib
+import threading
+from collections import defaultdict
+from urllib.parse import urlparse
+from typing import List, Dict, Callable, Awaitable, Iterator, Optional, TextIO, Tuple
+import aiohttp
 import requests
-from bs4 import BeautifulSoup
-import feedparser
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from selectolax.lexbor import LexborHTMLParser
+from lxml import etree
+from lxml import html as lxml_html
 
 # ----------------------------
 # CONFIG: Local Ollama / Model
@@ -16,6 +28,25 @@ MODEL_NAME = "deepseek-r1:8b"
 TEMPERATURE = 0.6
 TIMEOUT = 60
 MIN_LEN = 200
+MAX_EXTRACT_LEN = 5000  # extracts are trimmed to this; the prompt only uses the first 2500 chars
+EXTRACTOR_VERSION = 1   # bump when extract_text_generic changes so cached extracts are redone
+MAX_CONCURRENCY = 10  # in-flight page fetches across all extractors
+HOST_RATE = 4         # requests per second per host (bursts up to the same size)
+RETRY_TOTAL = 3       # retries for transient upstream errors
+RETRY_BACKOFF = 0.3   # seconds; doubles each attempt
+RETRY_STATUSES = {502, 503, 504}
+_WS = re.compile(r"\s+")
+YEAR_RE = re.compile(r"\[(?:19|20)\d{2}\]")  # medium-neutral citation year, e.g. "[2024]"
+
+# On-disk cache (sqlite) shared by all runs
+CACHE_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".debattle_cache.db")
+HTTP_CACHE_TTL = 3600  # seconds a cached page is served without revalidating
+CACHE_MAX_AGE = 7 * 86400  # rows not refreshed for this long are dropped when the cache opens
+CACHE_MAX_ROWS = 500       # per table, most recently refreshed rows are kept
+# Development aid: replay identical (model, temperature, prompt) answers instead of sampling
+# a fresh hypothetical. Off unless DEBATTLE_LLM_CACHE=1; entries expire after LLM_CACHE_TTL.
+LLM_CACHE = os.getenv("DEBATTLE_LLM_CACHE", "0") == "1"
+LLM_CACHE_TTL = 86400
 
 
 # ----------------------------
@@ -36,227 +67,532 @@ HEADERS = {
     "User-Agent": "DebateCaseGenerator/1.0 (educational; respects robots; contact: local)"
 }
 
+# ----------------------------
+# CACHE
+# ----------------------------
+_DB: Optional[sqlite3.Connection] = None
+_DB_LOCK = threading.Lock()
+
+def _db() -> sqlite3.Connection:
+    # Call with _DB_LOCK held; the connection is shared across threads
+    global _DB
+    if _DB is None:
+        conn = sqlite3.connect(CACHE_DB, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS http_cache("
+            "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, fetched_at REAL, body TEXT)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS extracts("
+            "url TEXT PRIMARY KEY, body_hash TEXT, fetched_at REAL, text TEXT)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache("
+            "key TEXT PRIMARY KEY, created_at REAL, content TEXT)"
+        )
+        _prune(conn)
+        _DB = conn
+    return _DB
+
+def _prune(conn: sqlite3.Connection) -> None:
+    # Bound the cache once per run: drop stale rows, then cap each table's size
+    cutoff = time.time() - CACHE_MAX_AGE
+    for table, key, ts in (("http_cache", "url", "fetched_at"), ("extracts", "url", "fetched_at")):
+        conn.execute(f"DELETE FROM {table} WHERE {ts} < ?", (cutoff,))
+        conn.execute(
+            f"DELETE FROM {table} WHERE {key} NOT IN "
+            f"(SELECT {key} FROM {table} ORDER BY {ts} DESC LIMIT ?)",
+            (CACHE_MAX_ROWS,),
+        )
+    conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - LLM_CACHE_TTL,))
+    conn.commit()
+
+def http_cache_get(url: str) -> Optional[Tuple[Optional[str], Optional[str], float, str]]:
+    """Return (etag, last_modified, fetched_at, body) for a cached URL, or None."""
+    try:
+        with _DB_LOCK:
+            return _db().execute(
+                "SELECT etag, last_modified, fetched_at, body FROM http_cache WHERE url = ?", (url,)
+            ).fetchone()
+    except sqlite3.Error:
+        return None
+
+def http_cache_put(url: str, etag: Optional[str], last_modified: Optional[str], body: str) -> None:
+    try:
+        with _DB_LOCK:
+            conn = _db()
+            conn.execute(
+                "INSERT OR REPLACE INTO http_cache VALUES (?, ?, ?, ?, ?)",
+                (url, etag, last_modified, time.time(), body),
+            )
+            conn.commit()
+    except sqlite3.Error:
+        pass
+
+def extract_cache_get(url: str, body_hash: str) -> Optional[str]:
+    try:
+        with _DB_LOCK:
+            row = _db().execute(
+                "SELECT text FROM extracts WHERE url = ? AND body_hash = ?", (url, body_hash)
+            ).fetchone()
+        return row[0] if row else None
+    except sqlite3.Error:
+        return None
+
+def extract_cache_put(url: str, body_hash: str, text: str) -> None:
+    try:
+        with _DB_LOCK:
+            conn = _db()
+            conn.execute(
+                "INSERT OR REPLACE INTO extracts VALUES (?, ?, ?, ?)",
+                (url, body_hash, time.time(), text),
+            )
+            conn.commit()
+    except sqlite3.Error:
+        pass
+
+def llm_cache_key(prompt: str) -> str:
+    return hashlib.blake2b(f"{MODEL_NAME}|{TEMPERATURE}|{prompt}".encode("utf-8")).hexdigest()
+
+def llm_cache_get(key: str) -> Optional[str]:
+    try:
+        with _DB_LOCK:
+            row = _db().execute(
+                "SELECT content FROM llm_cache WHERE key = ? AND created_at >= ?",
+                (key, time.time() - LLM_CACHE_TTL),
+            ).fetchone()
+        return row[0] if row else None
+    except sqlite3.Error:
+        return None
+
+def llm_cache_put(key: str, content: str) -> None:
+    try:
+        with _DB_LOCK:
+            conn = _db()
+            conn.execute("INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?)", (key, time.time(), content))
+            conn.commit()
+    except sqlite3.Error:
+        pass
+
 # ----------------------------
 # FETCHERS
 # ----------------------------
-def fetch_url(url: str) -> str:
-    r = requests.get(url, timeout=TIMEOUT, headers=HEADERS)
-    r.raise_for_status()
-    return r.text
+class HostLimiter:
+    """Async token bucket: `rate` requests per second, bursting up to `rate`."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+# Politeness is per host: different courts proceed in parallel, bursts to one court are shaped
+HOST_LIMITERS: Dict[str, HostLimiter] = defaultdict(lambda: HostLimiter(HOST_RATE))
+
+def make_session() -> aiohttp.ClientSession:
+    # One session (and connection pool) per run; must be created inside the event loop
+    connector = aiohttp.TCPConnector(limit=20, ttl_dns_cache=300)
+    return aiohttp.ClientSession(
+        connector=connector,
+        headers=HEADERS,
+        timeout=aiohttp.ClientTimeout(total=TIMEOUT),
+    )
+
+async def fetch_url(session: aiohttp.ClientSession, url: str, sem: asyncio.BoundedSemaphore) -> str:
+    """
+    GET with an on-disk cache: fresh entries are served directly, stale ones are
+    revalidated with If-None-Match / If-Modified-Since, and served as-is if the host errors.
+    """
+    # sqlite calls (and their commits) run on a worker thread, off the event loop
+    cached = await asyncio.to_thread(http_cache_get, url)
+    if cached and time.time() - cached[2] < HTTP_CACHE_TTL:
+        return cached[3]
+
+    headers = {}
+    if cached and cached[0]:
+        headers["If-None-Match"] = cached[0]
+    if cached and cached[1]:
+        headers["If-Modified-Since"] = cached[1]
+
+    try:
+        attempt = 0
+        while True:
+            # Wait for this host's token before taking a global slot, so requests queued
+            # behind a throttled court never hold slots that other hosts could use
+            await HOST_LIMITERS[urlparse(url).netloc].acquire()
+            async with sem, session.get(url, headers=headers) as resp:
+                if not (resp.status in RETRY_STATUSES and attempt < RETRY_TOTAL):
+                    if resp.status == 304 and cached:
+                        await asyncio.to_thread(http_cache_put, url, cached[0], cached[1], cached[3])
+                        return cached[3]
+                    resp.raise_for_status()
+                    body = await resp.text()
+                    await asyncio.to_thread(http_cache_put, url, resp.headers.get("ETag"),
+                                            resp.headers.get("Last-Modified"), body)
+                    return body
+            # back off outside the response so the connection returns to the pool
+            await asyncio.sleep(RETRY_BACKOFF * 2 ** attempt)
+            attempt += 1
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        if cached:
+            return cached[3]
+        raise
+
+def _norm(s: str) -> str:
+    # Collapse whitespace runs in one C-level pass (cheaper than split + join on big pages)
+    return _WS.sub(" ", s).strip()
+
+def bounded_text(node, cap: int) -> str:
+    """
+    Same result as _norm(node.text(separator=" "))[:cap], but walks text nodes in
+    document order and stops once `cap` characters are collected, so the rest of a
+    long judgment body is never touched.
+    """
+    buf: List[str] = []
+    n = 0
+    for child in node.traverse(include_text=True):
+        if child.tag != "-text":
+            continue
+        piece = _norm(child.text_content or "")
+        if not piece:
+            continue
+        buf.append(piece)
+        n += len(piece) + 1
+        if n > cap:
+            break
+    return " ".join(buf)[:cap]
+
+def _node_text(node) -> str:
+    return bounded_text(node, MAX_EXTRACT_LEN)
 
 def extract_text_generic(html: str, selectors: List[str]) -> str:
     """
     Pull readable text from the first matching selector.
     Fallback: <main> or <article>, else whole page (minified).
+    The result is capped at MAX_EXTRACT_LEN characters.
     """
-    soup = BeautifulSoup(html, "html.parser")
+    tree = LexborHTMLParser(html)
+    tree.strip_tags(["script", "style", "noscript"])
     for sel in selectors:
-        el = soup.select_one(sel)
-        if el:
-            text = " ".join(el.get_text(" ").split())
+        node = tree.css_first(sel)
+        if node:
+            text = _node_text(node)
             if len(text) > MIN_LEN:
                 return text
     # try main/article
     for sel in ["main", "article"]:
-        el = soup.find(sel)
-        if el:
-            text = " ".join(el.get_text(" ").split())
+        node = tree.css_first(sel)
+        if node:
+            text = _node_text(node)
             if len(text) > MIN_LEN:
                 return text
     # fallback whole page
-    return " ".join(soup.get_text(" ").split())
+    root = tree.body or tree.root
+    return _node_text(root) if root is not None else ""
 
-def get_business_extracts(limit: int = 6) -> List[Dict]:
+def cached_extract(url: str, html: str, selectors: List[str]) -> str:
     """
-    Federal Court of Australia (FCA) business/commercial-friendly:
-    Try the official FCA judgments RSS first; if empty, fall back to the FCA Latest Judgments page.
+    extract_text_generic, skipped when this URL's body is unchanged since the last parse.
+    The key also covers the selectors and extractor settings, so changing either re-parses.
     """
-    out: List[Dict] = []
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{EXTRACTOR_VERSION}|{MAX_EXTRACT_LEN}|{MIN_LEN}|{chr(31).join(selectors)}|".encode("utf-8"))
+    h.update(html.encode("utf-8", "replace"))
+    body_hash = h.hexdigest()
+    text = extract_cache_get(url, body_hash)
+    if text is None:
+        text = extract_text_generic(html, selectors)
+        extract_cache_put(url, body_hash, text)
+    return text
+
+async def fetch_extracts(session: aiohttp.ClientSession, sem: asyncio.BoundedSemaphore,
+                         candidates: List[Tuple[str, str]], selectors: List[str],
+                         min_len: int, limit: int) -> List[Dict]:
+    """
+    Fetch (title, url) candidates concurrently and keep pages whose text is >= min_len.
+    Candidates are gathered MAX_CONCURRENCY at a time so we stop early once `limit` is reached.
+    Parsing runs on worker threads so it overlaps with fetches still in flight.
+    """
+    async def fetch_and_extract(url: str) -> str:
+        html = await fetch_url(session, url, sem)
+        return await asyncio.to_thread(cached_extract, url, html, selectors)
 
-    # --- Try RSS first (official) ---
-    try:
-        feed = feedparser.parse(FCA_RSS)  # https://www.judgments.fedcourt.gov.au/rss/fca-judgments
-        entries = list(feed.entries)[:limit * 2]  # grab a few extra; we’ll filter below
-        random.shuffle(entries)
-        for e in entries:
-            try:
-                if not getattr(e, "link", None):
-                    continue
-                html = fetch_url(e.link)
-                text = extract_text_generic(html, selectors=[
-                    "main", "#content", ".content", "article"
-                ])
-                if len(text) >= MIN_LEN:
-                    out.append({"title": e.title, "url": e.link, "text": text})
-                if len(out) >= limit:
-                    return out
-                time.sleep(0.3)
-            except Exception:
+    out: List[Dict] = []
+    for i in range(0, len(candidates), MAX_CONCURRENCY):
+        batch = candidates[i:i + MAX_CONCURRENCY]
+        texts = await asyncio.gather(
+            *[fetch_and_extract(url) for _, url in batch], return_exceptions=True
+        )
+        for (title, url), text in zip(batch, texts):
+            if isinstance(text, BaseException):
                 continue
-    except Exception:
-        pass
+            if len(text) >= min_len:
+                out.append({"title": title, "url": url, "text": text})
+            if len(out) >= limit:
+                return out
+    return out
 
-    # --- Fallback: FCA “Latest Judgments” HTML page ---
-    # https://www.fedcourt.gov.au/digital-law-library/judgments/latest
-    if len(out) < 2:
+# ----------------------------
+# LINK HARVESTING (sync; run via asyncio.to_thread)
+# ----------------------------
+def _dedupe(links: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    # Index pages repeat the same href in nav/cards; keep the first title for each URL
+    seen = set()
+    out = []
+    for title, url in links:
+        if url in seen:
+            continue
+        seen.add(url)
+        out.append((title, url))
+    return out
+
+_LXML_LOCAL = threading.local()
+
+def _anchors(raw: str) -> Iterator[Tuple[str, "lxml_html.HtmlElement"]]:
+    """Yield (href, element) for every <a href> on an index page."""
+    # lxml parsers must not be shared between threads; keep one per worker thread
+    parser = getattr(_LXML_LOCAL, "parser", None)
+    if parser is None:
+        parser = _LXML_LOCAL.parser = lxml_html.HTMLParser(encoding="utf-8")
+    root = lxml_html.fromstring(raw.encode("utf-8"), parser=parser)
+    for a in root.iter("a"):
+        href = a.get("href")
+        if href:
+            yield href, a
+
+def _link_text(a) -> str:
+    return _norm(a.text_content())
+
+def _fca_rss_links(rss: str, limit: int) -> List[Tuple[str, str]]:
+    # Only <item><title>/<link> are used, so a plain lxml pull is enough
+    parser = etree.XMLParser(encoding="utf-8", recover=True, resolve_entities=False)
+    root = etree.fromstring(rss.encode("utf-8"), parser)
+    if root is None:
+        return []
+    links = []
+    for item in root.iter("item"):
+        link = (item.findtext("link") or "").strip()
+        if link:
+            links.append(((item.findtext("title") or "").strip(), link))
+    return links[:limit]
+
+def _fca_latest_links(html: str) -> List[Tuple[str, str]]:
+    candidates = []
+    for href, a in _anchors(html):
+        # keep judgment links (usually to judgments.fedcourt.gov.au)
+        if "judgments.fedcourt.gov.au" not in href:
+            continue
+        title = _link_text(a)
+        if title:
+            candidates.append((title, href))
+    return _dedupe(candidates)
+
+def _hca_judgment_links(html: str) -> List[Tuple[str, str]]:
+    # Collect links that look like judgments pages
+    links = []
+    for href, a in _anchors(html):
+        if "/judgments/" in href and href.startswith("http"):
+            links.append((_link_text(a) or "HCA Judgment", href))
+        elif "/judgments/" in href and href.startswith("/"):
+            links.append((_link_text(a) or "HCA Judgment", "https://www.hcourt.gov.au" + href))
+    return _dedupe(links)
+
+def _hca_current_cases(html: str, limit: int) -> List[Dict]:
+    # Full parse: briefs live in <article>/.item containers, not just links
+    items = LexborHTMLParser(html).css("article, .item, li a")
+    random.shuffle(items)
+    out = []
+    for el in items[:limit]:
         try:
-            latest_html = fetch_url("https://www.fedcourt.gov.au/digital-law-library/judgments/latest")
-            soup = BeautifulSoup(latest_html, "html.parser")
-            candidates = []
-            for a in soup.select("a[href]"):
-                href = a.get("href", "")
-                title = a.get_text(" ", strip=True)
-                if not title:
-                    continue
-                # keep judgment links (usually to judgments.fedcourt.gov.au)
-                if "judgments.fedcourt.gov.au" in href:
-                    candidates.append((title, href))
-            random.shuffle(candidates)
-            for title, url in candidates[:limit * 2]:
-                try:
-                    html = fetch_url(url)
-                    text = extract_text_generic(html, selectors=[
-                        "main", "#content", ".content", "article"
-                    ])
-                    if len(text) >= MIN_LEN:
-                        out.append({"title": title, "url": url, "text": text})
-                    if len(out) >= limit:
-                        break
-                    time.sleep(0.3)
-                except Exception:
-                    continue
+            t = _norm(el.text(separator=" "))
+            href = el.attributes.get("href")
+            url = href if (href and href.startswith("http")) else (
+                ("https://www.hcourt.gov.au" + href) if href and href.startswith("/") else HCA_CURRENT_CASES
+            )
+            text = t
+            out.append({"title": t[:120] or "HCA Current Case", "url": url, "text": text})
         except Exception:
-            pass
+            continue
+    return out
+
+def _vic_summary_links(html: str) -> List[Tuple[str, str]]:
+    # Grab visible entries (links around 'Judgment summary' items)
+    cand = []
+    for href, a in _anchors(html):
+        if href.lower().endswith(".pdf"):
+            continue
+        if href.startswith("/"):
+            url = "https://www.supremecourt.vic.gov.au" + href
+        elif href.startswith("http"):
+            url = href
+        else:
+            continue
+        title = _link_text(a)
+        if not title:
+            continue
+        cand.append((title, url))
+    return _dedupe(cand)
+
+def _qca_judgment_links(html: str) -> List[Tuple[str, str]]:
+    cand = []
+    for href, a in _anchors(html):
+        if not href.startswith("http"):
+            # Queensland Judgments tends to use absolute hrefs; skip relative
+            continue
+        title = _link_text(a)
+        # filter a bit
+        if title and YEAR_RE.search(title):
+            cand.append((title, href))
+    return _dedupe(cand)
 
-    return out[:limit]
+# ----------------------------
+# EXTRACTORS
+# ----------------------------
+async def merge_sources(primary: Awaitable[List[Dict]], secondary: Awaitable[List[Dict]],
+                        limit: int) -> List[Dict]:
+    """
+    Run two sub-sources concurrently; primary results come first.
+    The secondary is cancelled if the primary alone fills `limit`.
+    """
+    first = asyncio.ensure_future(primary)
+    second = asyncio.ensure_future(secondary)
+    try:
+        out = await first
+        if len(out) >= limit:
+            return out[:limit]
+        return (out + await second)[:limit]
+    finally:
+        second.cancel()
+        await asyncio.gather(first, second, return_exceptions=True)
+
+async def _fca_rss_extracts(session: aiohttp.ClientSession, sem: asyncio.BoundedSemaphore,
+                            limit: int) -> List[Dict]:
+    try:
+        rss = await fetch_url(session, FCA_RSS, sem)  # https://www.judgments.fedcourt.gov.au/rss/fca-judgments
+        candidates = await asyncio.to_thread(_fca_rss_links, rss, limit * 2)  # grab a few extra; we’ll filter below
+        random.shuffle(candidates)
+        return await fetch_extracts(session, sem, candidates, ["main", "#content", ".content", "article"],
+                                    min_len=MIN_LEN, limit=limit)
+    except Exception:
+        return []
 
+async def _fca_latest_extracts(session: aiohttp.ClientSession, sem: asyncio.BoundedSemaphore,
+                               limit: int) -> List[Dict]:
+    # https://www.fedcourt.gov.au/digital-law-library/judgments/latest
+    try:
+        latest_html = await fetch_url(session, "https://www.fedcourt.gov.au/digital-law-library/judgments/latest", sem)
+        candidates = await asyncio.to_thread(_fca_latest_links, latest_html)
+        random.shuffle(candidates)
+        return await fetch_extracts(session, sem, candidates[:limit * 2],
+                                    ["main", "#content", ".content", "article"],
+                                    min_len=MIN_LEN, limit=limit)
+    except Exception:
+        return []
 
-def get_constitutional_extracts(limit_pages: int = 1, limit_items: int = 5) -> List[Dict]:
+async def get_business_extracts(session: aiohttp.ClientSession, sem: asyncio.BoundedSemaphore,
+                                limit: int = 6) -> List[Dict]:
     """
-    High Court pages: take the judgments 2000-current index and/or current cases.
-    We fetch the index page, collect some case links, then fetch a few case pages.
+    Federal Court of Australia (FCA) business/commercial-friendly:
+    The official FCA judgments RSS is preferred; the FCA Latest Judgments page is
+    fetched alongside it and tops up the results if the feed comes up short.
     """
-    out = []
+    return await merge_sources(
+        _fca_rss_extracts(session, sem, limit),
+        _fca_latest_extracts(session, sem, limit),
+        limit,
+    )
+
+async def _hca_judgment_extracts(session: aiohttp.ClientSession, sem: asyncio.BoundedSemaphore,
+                                 limit_items: int) -> List[Dict]:
     try:
-        html = fetch_url(HCA_JUDGMENTS_LIST)
-        soup = BeautifulSoup(html, "html.parser")
-        # Collect links that look like judgments pages
-        links = []
-        for a in soup.select("a[href]"):
-            href = a.get("href", "")
-            if "/judgments/" in href and href.startswith("http"):
-                links.append((a.get_text(strip=True), href))
-            elif "/judgments/" in href and href.startswith("/"):
-                links.append((a.get_text(strip=True), "https://www.hcourt.gov.au" + href))
-        # Deduplicate and sample
+        html = await fetch_url(session, HCA_JUDGMENTS_LIST, sem)
+        links = await asyncio.to_thread(_hca_judgment_links, html)  # already deduplicated
+        # Sample
         random.shuffle(links)
         links = links[:limit_items]
-        for title, url in links:
-            try:
-                page = fetch_url(url)
-                text = extract_text_generic(page, selectors=["main", "#content", ".content"])
-                out.append({"title": title or "HCA Judgment", "url": url, "text": text})
-                time.sleep(0.5)
-            except Exception:
-                continue
+        return await fetch_extracts(session, sem, links, ["main", "#content", ".content"],
+                                    min_len=0, limit=limit_items)
     except Exception:
-        pass
+        return []
 
-    # Add a couple from Current Cases (short briefs), if available
+async def _hca_current_extracts(session: aiohttp.ClientSession, sem: asyncio.BoundedSemaphore,
+                                limit_items: int) -> List[Dict]:
+    # Current Cases are short briefs; the listing text itself is the extract
     try:
-        html = fetch_url(HCA_CURRENT_CASES)
-        soup = BeautifulSoup(html, "html.parser")
-        items = soup.select("article, .item, li a")
-        random.shuffle(items)
-        for el in items[:max(1, limit_items // 2)]:
-            try:
-                t = el.get_text(" ", strip=True)
-                href = el.get("href") if hasattr(el, "get") else None
-                url = href if (href and href.startswith("http")) else (
-                    ("https://www.hcourt.gov.au" + href) if href and href.startswith("/") else HCA_CURRENT_CASES
-                )
-                text = t
-                out.append({"title": t[:120] or "HCA Current Case", "url": url, "text": text})
-            except Exception:
-                continue
+        html = await fetch_url(session, HCA_CURRENT_CASES, sem)
+        return await asyncio.to_thread(_hca_current_cases, html, max(1, limit_items // 2))
     except Exception:
-        pass
-
-    return out[:limit_items]
+        return []
 
-def get_criminal_extracts(limit_items: int = 5) -> List[Dict]:
+async def get_constitutional_extracts(session: aiohttp.ClientSession, sem: asyncio.BoundedSemaphore,
+                                      limit_pages: int = 1, limit_items: int = 5) -> List[Dict]:
     """
-    Use VIC Supreme Court judgment summaries page & QLD QCA latest page.
-    We avoid PDFs (skip links ending with .pdf).
+    High Court pages: take the judgments 2000-current index and/or current cases.
+    We fetch the index page, collect some case links, then fetch a few case pages;
+    a couple of Current Cases briefs are fetched concurrently and appended.
     """
-    out = []
+    return await merge_sources(
+        _hca_judgment_extracts(session, sem, limit_items),
+        _hca_current_extracts(session, sem, limit_items),
+        limit_items,
+    )
+
+async def _vic_extracts(session: aiohttp.ClientSession, sem: asyncio.BoundedSemaphore,
+                        limit_items: int) -> List[Dict]:
     # VIC summaries (often link to a summary page and PDFs)
     try:
-        html = fetch_url(VIC_SC_JUDGMENT_SUMMARIES)
-        soup = BeautifulSoup(html, "html.parser")
-        # Grab visible entries (links around 'Judgment summary' items)
-        for a in soup.select("a[href]"):
-            href = a["href"]
-            if href.lower().endswith(".pdf"):
-                continue
-            if href.startswith("/"):
-                url = "https://www.supremecourt.vic.gov.au" + href
-            elif href.startswith("http"):
-                url = href
-            else:
-                continue
-            title = a.get_text(" ", strip=True)
-            if not title:
-                continue
-            try:
-                sub = fetch_url(url)
-                text = extract_text_generic(sub, selectors=["main", ".content", "#content"])
-                if len(text) > 600:
-                    out.append({"title": title, "url": url, "text": text})
-                    if len(out) >= limit_items:
-                        break
-                time.sleep(0.5)
-            except Exception:
-                continue
+        html = await fetch_url(session, VIC_SC_JUDGMENT_SUMMARIES, sem)
+        cand = await asyncio.to_thread(_vic_summary_links, html)
+        return await fetch_extracts(session, sem, cand, ["main", ".content", "#content"],
+                                    min_len=600, limit=limit_items)
     except Exception:
-        pass
+        return []
 
+async def _qca_extracts(session: aiohttp.ClientSession, sem: asyncio.BoundedSemaphore,
+                        limit_items: int) -> List[Dict]:
     # QLD QCA recent judgments (index page with case links)
-    if len(out) < limit_items:
-        try:
-            html = fetch_url(QLD_QCA_LATEST)
-            soup = BeautifulSoup(html, "html.parser")
-            cand = []
-            for a in soup.select("a[href]"):
-                href = a["href"]
-                if not href.startswith("http"):
-                    # Queensland Judgments tends to use absolute hrefs; skip relative
-                    continue
-                title = a.get_text(" ", strip=True)
-                # filter a bit
-                if title and ("[20" in title or "[19" in title):
-                    cand.append((title, href))
-            random.shuffle(cand)
-            for title, url in cand[:limit_items]:
-                try:
-                    page = fetch_url(url)
-                    text = extract_text_generic(page, selectors=["main", ".content", "#content"])
-                    if len(text) > 500:
-                        out.append({"title": title, "url": url, "text": text})
-                        if len(out) >= limit_items:
-                            break
-                    time.sleep(0.5)
-                except Exception:
-                    continue
-        except Exception:
-            pass
+    try:
+        html = await fetch_url(session, QLD_QCA_LATEST, sem)
+        cand = await asyncio.to_thread(_qca_judgment_links, html)
+        random.shuffle(cand)
+        return await fetch_extracts(session, sem, cand[:limit_items], ["main", ".content", "#content"],
+                                    min_len=500, limit=limit_items)
+    except Exception:
+        return []
 
-    # Truncate to desired size
-    return out[:limit_items]
+async def get_criminal_extracts(session: aiohttp.ClientSession, sem: asyncio.BoundedSemaphore,
+                                limit_items: int = 5) -> List[Dict]:
+    """
+    Use VIC Supreme Court judgment summaries page & QLD QCA latest page.
+    Both are fetched concurrently; VIC results come first.
+    We avoid PDFs (skip links ending with .pdf).
+    """
+    return await merge_sources(
+        _vic_extracts(session, sem, limit_items),
+        _qca_extracts(session, sem, limit_items),
+        limit_items,
+    )
 
 # ----------------------------
 # PROMPTING DEEPSEEK
 # ----------------------------
+# Keep-alive session for Ollama; connect retries cover a server that is still starting
+OLLAMA_SESSION = requests.Session()
+OLLAMA_SESSION.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=4,
+                                            max_retries=Retry(total=RETRY_TOTAL, backoff_factor=RETRY_BACKOFF)))
+
 PROMPT_TEMPLATE = """You are drafting concise AU debate hypotheticals.
 Read the excerpts below (from AU judgments). Create ONE short, hypothetical case
 for the selected area: {AREA}. DO NOT copy facts; invent new facts inspired by themes.
@@ -276,53 +612,138 @@ FORMAT:
 - Suggested debate motion (1):
 """
 
-def ask_deepseek(area: str, extracts: str) -> str:
+def ask_deepseek(area: str, extracts: str, stream_to: Optional[TextIO] = None) -> str:
+    """
+    Stream the answer from Ollama. Content tokens are echoed to `stream_to` as they
+    arrive (if given); the full answer is returned. `.thinking` chunks are not echoed.
+    With LLM_CACHE on, a recent answer to the identical prompt is replayed from the cache.
+    """
+    prompt = PROMPT_TEMPLATE.format(AREA=area, EXTRACTS=extracts)
+    key = llm_cache_key(prompt)
+    cached = llm_cache_get(key) if LLM_CACHE else None
+    if cached:
+        if stream_to is not None:
+            stream_to.write(cached)
+            stream_to.flush()
+        return cached
+
     payload = {
         "model": MODEL_NAME,
-        "messages": [{"role": "user", "content": PROMPT_TEMPLATE.format(AREA=area, EXTRACTS=extracts)}],
+        "messages": [{"role": "user", "content": prompt}],
         "think": True,
-        "stream": False,
+        "stream": True,
         "options": {"temperature": TEMPERATURE},
     }
-    r = requests.post(OLLAMA_URL, json=payload, timeout=120)
-    r.raise_for_status()
-    data = r.json()
-
-    # Try the common shapes
-    content = (
-        (data.get("message") or {}).get("content")
-        or data.get("response")                   # some builds use 'response'
-    )
+    parts: List[str] = []
+    with OLLAMA_SESSION.post(OLLAMA_URL, json=payload, timeout=120, stream=True) as r:
+        r.raise_for_status()
+        for line in r.iter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            # Try the common shapes
+            piece = (
+                (chunk.get("message") or {}).get("content")
+                or chunk.get("response")                  # some builds use 'response'
+                or ""
+            )
+            if piece:
+                parts.append(piece)
+                if stream_to is not None:
+                    stream_to.write(piece)
+                    stream_to.flush()
+            if chunk.get("done"):
+                break
+
+    content = "".join(parts)
     if not content:
-        raise RuntimeError(f"Unexpected Ollama payload: keys={list(data.keys())}")
+        raise RuntimeError("Unexpected Ollama payload: stream contained no content")
+    if LLM_CACHE:
+        llm_cache_put(key, content)
     return content
 
-    r = requests.post("http://localhost:11434", json=payload, timeout=120)
-    r.raise_for_status()
-    data = r.json()
-
-    # data["message"] will contain both `.thinking` and `.content` when think=True.
-    # We only return the final answer:
-    return data["message"]["content"]
-
 # ----------------------------
 # MAIN
 # ----------------------------
-AREA_SOURCES: Dict[str, List[Callable[[], List[Dict]]]] = {
-    "constitutional": [lambda: get_constitutional_extracts(limit_items=6)],
-    "business": [lambda: get_business_extracts(limit=6)],
-    "criminal": [lambda: get_criminal_extracts(limit_items=6)],
+Fetcher = Callable[[aiohttp.ClientSession, asyncio.BoundedSemaphore], Awaitable[List[Dict]]]
+
+AREA_SOURCES: Dict[str, List[Fetcher]] = {
+    "constitutional": [lambda session, sem: get_constitutional_extracts(session, sem, limit_items=6)],
+    "business": [lambda session, sem: get_business_extracts(session, sem, limit=6)],
+    "criminal": [lambda session, sem: get_criminal_extracts(session, sem, limit_items=6)],
 }
 
+def _resolve(fut: asyncio.Future, value=None, exc: Optional[BaseException] = None) -> None:
+    if fut.done():  # cancelled while the user was still typing
+        return
+    if exc is not None:
+        fut.set_exception(exc)
+    else:
+        fut.set_result(value)
+
+async def _ainput(prompt: str = "") -> str:
+    """
+    input() on a daemon thread that hands the line back via call_soon_threadsafe.
+    Unlike asyncio.to_thread, nothing joins this thread at shutdown, so Ctrl-C at
+    the prompt exits straight away instead of waiting for another Enter.
+    """
+    loop = asyncio.get_running_loop()
+    fut = loop.create_future()
+
+    def reader():
+        try:
+            value, exc = input(prompt), None
+        except BaseException as e:  # EOFError on closed stdin, etc.
+            value, exc = None, e
+        try:
+            loop.call_soon_threadsafe(_resolve, fut, value, exc)
+        except RuntimeError:  # loop already closed; nobody is waiting
+            pass
+
+    threading.Thread(target=reader, daemon=True).start()
+    return await fut
+
+async def prefetch_and_choose() -> Tuple[str, List[Dict]]:
+    """
+    Start every area's fetcher before asking for the area, so network I/O overlaps
+    with the prompt. The unchosen fetchers are cancelled once the user answers;
+    whatever they fetched so far stays in the on-disk cache for the next run.
+    """
+    sem = asyncio.BoundedSemaphore(MAX_CONCURRENCY)
+    async with make_session() as session:
+        tasks = {
+            a: asyncio.create_task(random.choice(sources)(session, sem))
+            for a, sources in AREA_SOURCES.items()
+        }
+        try:
+            area = (await _ainput("> ")).strip().lower()
+            for a, task in tasks.items():
+                if a != area:
+                    task.cancel()
+            if area not in tasks:
+                return area, []
+            try:
+                return area, await tasks[area]
+            except Exception:
+                return area, []
+        finally:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+
 def main():
-    print("Choose case type: [constitutional] [business] [criminal]")
-    area = input("> ").strip().lower()
+    print("Choose case type: [constitutional] [business] [criminal]", flush=True)
+    try:
+        area, cases = asyncio.run(prefetch_and_choose())
+    except KeyboardInterrupt:
+        # The prompt's reader thread still holds stdin's lock; a normal interpreter
+        # shutdown would abort trying to flush it, so leave without finalizing.
+        print(flush=True)
+        os._exit(130)
     if area not in AREA_SOURCES:
         print("Unknown type. Please choose 'constitutional', 'business', or 'criminal'.")
         sys.exit(1)
 
-    fetcher = random.choice(AREA_SOURCES[area])
-    cases = fetcher()
     if not cases:
         print("Could not fetch source texts right now. Try again in a minute.")
         sys.exit(2)
@@ -332,19 +753,16 @@ def main():
     chosen = cases[:3]
     extracts_text = "\n\n".join(f"### {c['title']}\n{c['text'][:2500]}" for c in chosen)
 
-    # Call DeepSeek (Ollama)
+    # Pretty print; the answer streams in as DeepSeek (Ollama) generates it
+    print("\n" + "="*80)
+    print(f"HYPOTHETICAL {area.upper()} CASE (DeepSeek)")
+    print("="*80 + "\n", flush=True)
     try:
-        output = ask_deepseek(area.title(), extracts_text)
+        ask_deepseek(area.title(), extracts_text, stream_to=sys.stdout)
     except Exception as e:
-        print("DeepSeek call failed:", e)
+        print("\nDeepSeek call failed:", e)
         sys.exit(3)
-
-    # Pretty print
-    print("\n" + "="*80)
-    print(f"HYPOTHETICAL {area.upper()} CASE (DeepSeek)")
-    print("="*80 + "\n")
-    print(output)
-    print("\n" + "="*80)
+    print("\n\n" + "="*80)
     print("Sources used for inspiration:")
     for c in chosen:
         print(f"- {c['title']}  -> {c['url']}")
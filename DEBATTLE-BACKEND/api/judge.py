@@ -5,20 +5,44 @@
 # - Guarantees paragraphs for overview & improvements, and rich move explanations (when not low-content)
 # - HARD notable-move enforcement + speech slot assignment
 # - Optional --debug to print label counts after balancing
+# - Optional --batch-dir to judge many transcripts concurrently; start the server with
+#   OLLAMA_NUM_PARALLEL=4 (or more) so the requests actually overlap
+# - Start the server with OLLAMA_FLASH_ATTENTION=1 to use fused attention kernels where supported
+# - Results are cached on disk by prompt/options hash; --no-cache forces a fresh judgement
 
+import os
+import glob
 import json
+import asyncio
 import argparse
-import requests
 import re
-from jsonschema import validate, ValidationError
-
-import warnings as _warnings
-_warnings.filterwarnings("ignore", category=UserWarning, module="urllib3")
+import hashlib
+import stat
+import tempfile
+from functools import lru_cache
+import httpx
+import orjson
+from ollama import AsyncClient
 
 # ---------- CONFIG ----------
 OLLAMA_URL = "http://localhost:11434"
 MODEL = "deepseek-r1:latest"
 TIMEOUT = 120
+KEEP_ALIVE = "30m"  # keep the model (and its prompt-prefix KV cache) loaded between runs
+NUM_CTX_MIN = 4096
+NUM_CTX_MAX = 32768
+# Reply tokens reserved when sizing num_ctx: a typical verdict, not the worst case.
+# NUM_PREDICT (below) is the separate runaway guard and would push every call up a bucket
+NUM_CTX_REPLY = 1024
+# In-flight model calls per batch; matches the server's parallel slots so queued requests
+# don't sit on the client's read timeout while the server holds them back
+NUM_PARALLEL = max(1, int(os.getenv("OLLAMA_NUM_PARALLEL", "4")))
+# Keep-alive pool for the Ollama connection; sized above OLLAMA_NUM_PARALLEL so batch
+# requests never wait on a socket and repeated calls reuse warm connections
+POOL_LIMITS = httpx.Limits(max_connections=32, max_keepalive_connections=8, keepalive_expiry=60)
+CACHE_DIR = os.path.join(tempfile.gettempdir(), "debattle_judge")
+CACHE_MAX_ENTRIES = 512  # least-recently-used results are swept beyond this
+RESULT_CACHE_VERSION = 1  # bump when post-processing changes so cached results are not reused
 
 SPEECH_SLOTS = ["First Speech", "Second Speech", "Third Speech", "Reply"]
 
@@ -94,6 +118,133 @@ JUDGE_SCHEMA = {
   }
 }
 
+# Output budget from the schema's worst case, so a complete answer always fits;
+# num_predict only bounds a runaway decode, it doesn't slow a normal one
+_CHARS_PER_TOKEN = 3          # conservative for English inside JSON
+_SENTENCE_CHARS = 120
+_MAX_MOVES_PER_TEAM = 6       # the prompt asks for >=4; extras are trimmed afterwards
+_SKELETON_CHARS = 1500        # keys, punctuation and indentation of the filled template
+_RATIONALE = JUDGE_SCHEMA["properties"]["rationale"]["properties"]
+_WORST_CASE_CHARS = (
+    _SKELETON_CHARS
+    + _RATIONALE["summary"]["maxLength"] + _RATIONALE["why_winner"]["maxLength"]
+    + _RATIONALE["key_clashes"]["maxItems"] * 2 * _SENTENCE_CHARS   # ~2 sentences per clash
+    + 2 * 4 * 2 * _SENTENCE_CHARS                                    # notes on all 8 speeches
+    + 2 * (2 * 6 * _SENTENCE_CHARS                                   # overview + improvements
+           + _MAX_MOVES_PER_TEAM * 5 * _SENTENCE_CHARS)              # moves: 2-5 sentences each
+)
+NUM_PREDICT = _WORST_CASE_CHARS // _CHARS_PER_TOKEN + 1
+
+# Hand-specialised validator for JUDGE_SCHEMA (the schema above stays as documentation).
+# Straight-line checks only; keep the two in sync when the schema changes.
+_FORMATS = frozenset(["Policy","BP","WSDC","Lincoln-Douglas","Other"])
+_WINNERS = frozenset(["AFFIRMATIVE","NEGATIVE","TIE"])
+_LABELS = frozenset(["brilliant","great","good","inaccuracy","blunder"])
+
+# Per-speech (matter, manner, method) caps in scoring order, read from the schema so the
+# clamp (enforce_ranges) and the validator share one source of truth
+SCORE_CATS = ("matter", "manner", "method")
+_CAPS_BY_KIND = {kind: tuple(JUDGE_SCHEMA["definitions"][kind]["properties"][cat]["maximum"]
+                             for cat in SCORE_CATS)
+                 for kind in ("speaker", "reply")}
+SCORE_CAPS = tuple((slot, _CAPS_BY_KIND["reply" if slot == "reply" else "speaker"])
+                   for slot in ("speaker1", "speaker2", "speaker3", "reply"))
+
+class JudgeValidationError(ValueError):
+    section = None  # index into _SECTIONS of the failing check
+
+def _obj(v, path):
+    if not isinstance(v, dict):
+        raise JudgeValidationError(f"{path} must be object")
+    return v
+
+def _req(obj, key, path):
+    if key not in obj:
+        raise JudgeValidationError(f"{path} must contain {key}")
+    return obj[key]
+
+def _str(v, path, max_len=None):
+    if not isinstance(v, str):
+        raise JudgeValidationError(f"{path} must be string")
+    if max_len is not None and len(v) > max_len:
+        raise JudgeValidationError(f"{path} must be shorter than or equal to {max_len} characters")
+
+def _enum(v, choices, path):
+    if not isinstance(v, str) or v not in choices:
+        raise JudgeValidationError(f"{path} must be one of {sorted(choices)}")
+
+def _score(v, path, caps):
+    sp = _obj(v, path)
+    for key, hi in zip(SCORE_CATS, caps):
+        n = _req(sp, key, path)
+        if isinstance(n, bool) or not isinstance(n, (int, float)):
+            raise JudgeValidationError(f"{path}.{key} must be number")
+        if not 0 <= n <= hi:
+            raise JudgeValidationError(f"{path}.{key} must be within 0..{hi}")
+    if "notes" in sp:
+        _str(sp["notes"], f"{path}.notes")
+
+def _check_meta(r):
+    meta = _obj(_req(r, "meta", "data"), "data.meta")
+    _enum(_req(meta, "format", "data.meta"), _FORMATS, "data.meta.format")
+    _str(_req(meta, "rules", "data.meta"), "data.meta.rules")
+
+def _check_scores(r):
+    scores = _obj(_req(r, "scores", "data"), "data.scores")
+    for side in ("affirmative", "negative"):
+        path = f"data.scores.{side}"
+        team = _obj(_req(scores, side, "data.scores"), path)
+        for slot, caps in SCORE_CAPS:
+            _score(_req(team, slot, path), f"{path}.{slot}", caps)
+
+def _check_winner(r):
+    _enum(_req(r, "winner", "data"), _WINNERS, "data.winner")
+
+def _check_rationale(r):
+    rat = _obj(_req(r, "rationale", "data"), "data.rationale")
+    _str(_req(rat, "summary", "data.rationale"), "data.rationale.summary", 700)
+    _str(_req(rat, "why_winner", "data.rationale"), "data.rationale.why_winner", 700)
+    clashes = _req(rat, "key_clashes", "data.rationale")
+    if not isinstance(clashes, list):
+        raise JudgeValidationError("data.rationale.key_clashes must be array")
+    if len(clashes) > 6:
+        raise JudgeValidationError("data.rationale.key_clashes must contain less than or equal to 6 items")
+    for i, c in enumerate(clashes):
+        _str(c, f"data.rationale.key_clashes[{i}]")
+
+def _check_analysis(r):
+    analysis = _obj(_req(r, "analysis", "data"), "data.analysis")
+    for side in ("affirmative", "negative"):
+        path = f"data.analysis.{side}"
+        blob = _obj(_req(analysis, side, "data.analysis"), path)
+        _str(_req(blob, "overview", path), f"{path}.overview")
+        _str(_req(blob, "improvements", path), f"{path}.improvements")
+        moves = _req(blob, "notable_moves", path)
+        if not isinstance(moves, list):
+            raise JudgeValidationError(f"{path}.notable_moves must be array")
+        for i, m in enumerate(moves):
+            mpath = f"{path}.notable_moves[{i}]"
+            _obj(m, mpath)
+            if "time" in m:
+                _str(m["time"], f"{mpath}.time")
+            _enum(_req(m, "label", mpath), _LABELS, f"{mpath}.label")
+            _str(_req(m, "explanation", mpath), f"{mpath}.explanation")
+
+# Checked in order; only "scores" and "analysis" are rewritten by the enforcers, so a
+# retry resumes at the failing section instead of re-walking the whole result.
+_SECTIONS = (_check_meta, _check_scores, _check_winner, _check_rationale, _check_analysis)
+_REPAIRABLE = frozenset([_SECTIONS.index(_check_scores), _SECTIONS.index(_check_analysis)])
+
+def _validate_judge(r, start=0):
+    """Raise JudgeValidationError (with .section set) at the first failing section."""
+    _obj(r, "data")
+    for i in range(start, len(_SECTIONS)):
+        try:
+            _SECTIONS[i](r)
+        except JudgeValidationError as e:
+            e.section = i
+            raise
+
 # ---------- HELPERS ----------
 def _messages_to_prompt(messages):
     lines = []
@@ -105,27 +256,57 @@ def _messages_to_prompt(messages):
     lines.append("Return ONLY valid JSON that matches the schema. Do not add any text before or after it.")
     return "\n".join(lines)
 
-def chat_ollama(messages, json_mode=True):
-    # Always hit the correct Ollama endpoint
-    base = OLLAMA_URL.rstrip("/")
-    endpoint = f"{base}/api/generate"
-
-    payload = {
-        "model": MODEL,
-        "prompt": _messages_to_prompt(messages),
-        "stream": False,
-        "options": {"temperature": 0}
-    }
-    if json_mode:
-        payload["format"] = "json"
-
-    r = requests.post(endpoint, json=payload, timeout=TIMEOUT)
-    r.raise_for_status()
-    content = r.json().get("response", "")
+def _num_ctx_for(prompt):
+    # Prompt tokens plus room for a typical reply, rounded up to a power of two: a changed
+    # num_ctx makes Ollama reload the model, so keep the number of distinct sizes small
+    need = len(prompt) // _CHARS_PER_TOKEN + NUM_CTX_REPLY
+    ctx = NUM_CTX_MIN
+    while ctx < need and ctx < NUM_CTX_MAX:
+        ctx *= 2
+    return ctx
+
+_GENERATE_OPTIONS = {"temperature": 0, "num_predict": NUM_PREDICT}
+
+# stdlib decoder for the streamed early stop: orjson has no prefix (raw_decode) parsing
+_JSON_DECODER = json.JSONDecoder()
+
+async def chat_ollama(messages, client, json_mode=True):
+    # /api/generate via the official client; one AsyncClient is shared per batch.
+    # Streamed, so we can stop reading as soon as the top-level JSON object closes.
+    prompt = _messages_to_prompt(messages)
+    stream = await client.generate(
+        model=MODEL,
+        prompt=prompt,
+        format="json" if json_mode else "",
+        options={**_GENERATE_OPTIONS, "num_ctx": _num_ctx_for(prompt)},
+        keep_alive=KEEP_ALIVE,
+        stream=True,
+    )
+    parts = []
+    done_reason = None
+    try:
+        async for chunk in stream:
+            done_reason = chunk.get("done_reason") or done_reason
+            piece = chunk["response"] or ""
+            parts.append(piece)
+            if "}" not in piece:
+                continue
+            buf = "".join(parts).lstrip()
+            try:
+                obj, _ = _JSON_DECODER.raw_decode(buf)
+            except json.JSONDecodeError:
+                continue
+            return obj
+    finally:
+        await stream.aclose()
+    content = "".join(parts)
+    if done_reason == "length":
+        raise RuntimeError(f"Model output was cut off at num_predict={NUM_PREDICT} tokens "
+                           "before the JSON object was complete.")
 
     try:
-        return json.loads(content)
-    except json.JSONDecodeError:
+        return orjson.loads(content)
+    except orjson.JSONDecodeError:
         raise RuntimeError("Model did not return valid JSON. Got:\n" + content)
 
 def _clip(v, lo, hi):
@@ -137,17 +318,11 @@ def enforce_ranges(result):
     scores = result.get("scores", {})
     for side in ["affirmative", "negative"]:
         side_obj = scores.get(side, {})
-        for spk in ["speaker1", "speaker2", "speaker3"]:
-            s = side_obj.get(spk, {})
-            s["matter"] = int(_clip(s.get("matter", 0), 0, 40))
-            s["manner"] = int(_clip(s.get("manner", 0), 0, 30))
-            s["method"] = int(_clip(s.get("method", 0), 0, 30))
-            side_obj[spk] = s
-        rep = side_obj.get("reply", {})
-        rep["matter"] = int(_clip(rep.get("matter", 0), 0, 20))
-        rep["manner"] = int(_clip(rep.get("manner", 0), 0, 15))
-        rep["method"] = int(_clip(rep.get("method", 0), 0, 15))
-        side_obj["reply"] = rep
+        for slot, caps in SCORE_CAPS:
+            s = side_obj.get(slot, {})
+            for cat, hi in zip(SCORE_CATS, caps):
+                s[cat] = int(_clip(s.get(cat, 0), 0, hi))
+            side_obj[slot] = s
         scores[side] = side_obj
     result["scores"] = scores
     return result
@@ -183,77 +358,83 @@ def scale_to_100(raw_total):  # 350/3.5 = 100
 LOW_CONTENT_SPEECH_MIN = 3      # fewer than this → low content
 LOW_CONTENT_CHAR_MIN   = 120    # total payload text length under this → low content
 
-def _extract_payload_text(transcript_text: str) -> str:
-    # Remove tags like "[00:00 AFF-1]" and keep only actual speech payload
-    return re.sub(r"\[\d{2}:\d{2}\s+(AFF|NEG)-[^\]]+\]\s*", "", transcript_text or "").strip()
+# One speech line: "[00:00 AFF-1] payload" — group 1 is the payload (tag + following spaces removed).
+# Horizontal whitespace only, so a match never runs onto the next line.
+_TAG_RE = re.compile(r"^\[\d{2}:\d{2}[^\S\n]+(?:AFF|NEG)-[^\]\n]+\][^\S\n]*(.*)$", re.MULTILINE)
 
 def is_low_content(transcript_text: str) -> bool:
     if not transcript_text or not transcript_text.strip():
         return True
-    lines = [ln for ln in transcript_text.splitlines() if ln.strip()]
-    speech_lines = [ln for ln in lines if re.match(r"\[\d{2}:\d{2}\s+(AFF|NEG)-", ln)]
-    payload = _extract_payload_text("\n".join(speech_lines))
-    return (len(speech_lines) < LOW_CONTENT_SPEECH_MIN) or (len(payload) < LOW_CONTENT_CHAR_MIN)
-
-def empty_result() -> dict:
-    zero_sp = {"matter": 0, "manner": 0, "method": 0, "notes": ""}
-    zero_reply = {"matter": 0, "manner": 0, "method": 0, "notes": ""}
-    return {
-        "meta": {
-            "format": "Policy",
-            "rules": "No new matter in 3rd speeches; reply is comparative only."
+    # Single pass: every match is a speech line, and its group is that line's payload
+    payloads = _TAG_RE.findall(transcript_text)
+    payload_len = len("\n".join(payloads).strip())
+    return (len(payloads) < LOW_CONTENT_SPEECH_MIN) or (payload_len < LOW_CONTENT_CHAR_MIN)
+
+_ZERO_SPEAKER = {"matter": 0, "manner": 0, "method": 0, "notes": ""}
+
+# Built once; empty_result() decodes a fresh copy (orjson.loads beats rebuilding the dicts)
+_EMPTY_RESULT_BYTES = orjson.dumps({
+    "meta": {
+        "format": "Policy",
+        "rules": "No new matter in 3rd speeches; reply is comparative only."
+    },
+    "scores": {
+        "affirmative": {
+            "speaker1": _ZERO_SPEAKER,
+            "speaker2": _ZERO_SPEAKER,
+            "speaker3": _ZERO_SPEAKER,
+            "reply": _ZERO_SPEAKER
         },
-        "scores": {
-            "affirmative": {
-                "speaker1": dict(zero_sp),
-                "speaker2": dict(zero_sp),
-                "speaker3": dict(zero_sp),
-                "reply": dict(zero_reply)
-            },
-            "negative": {
-                "speaker1": dict(zero_sp),
-                "speaker2": dict(zero_sp),
-                "speaker3": dict(zero_sp),
-                "reply": dict(zero_reply)
-            }
-        },
-        "winner": "TIE",
-        "rationale": {
-            "summary": "Insufficient material: there were not enough substantive speeches to evaluate the round.",
-            "why_winner": "No winner — both teams provided insufficient content.",
-            "key_clashes": []
+        "negative": {
+            "speaker1": _ZERO_SPEAKER,
+            "speaker2": _ZERO_SPEAKER,
+            "speaker3": _ZERO_SPEAKER,
+            "reply": _ZERO_SPEAKER
+        }
+    },
+    "winner": "TIE",
+    "rationale": {
+        "summary": "Insufficient material: there were not enough substantive speeches to evaluate the round.",
+        "why_winner": "No winner — both teams provided insufficient content.",
+        "key_clashes": []
+    },
+    "analysis": {
+        "affirmative": {
+            "overview": "No substantive speeches recorded for AFF.",
+            "improvements": "Deliver required speeches with claims, warrants, and comparison.",
+            "notable_moves": []
         },
-        "analysis": {
-            "affirmative": {
-                "overview": "No substantive speeches recorded for AFF.",
-                "improvements": "Deliver required speeches with claims, warrants, and comparison.",
-                "notable_moves": []
-            },
-            "negative": {
-                "overview": "No substantive speeches recorded for NEG.",
-                "improvements": "Deliver required speeches with claims, warrants, and comparison.",
-                "notable_moves": []
-            }
+        "negative": {
+            "overview": "No substantive speeches recorded for NEG.",
+            "improvements": "Deliver required speeches with claims, warrants, and comparison.",
+            "notable_moves": []
         }
     }
+})
+
+def empty_result() -> dict:
+    return orjson.loads(_EMPTY_RESULT_BYTES)
 
 # ----- Rich-text fallbacks (used only when NOT low-content) -----
+_SENT_RE = re.compile(r"[.!?]+")
+_ADDITIONS = (
+    "They framed the weighing early and attempted to collapse the round onto the decisive clashes.",
+    "Comparative analysis connected claims to explicit impacts, although some links could be clearer.",
+    "Time allocation and signposting generally supported flow and judge comprehension."
+)
+
 def _ensure_min_sentences(text: str, min_sents=3):
     t = (text or "").strip()
-    count = sum(1 for s in t.replace("!", ".").replace("?", ".").split(".") if s.strip())
+    count = sum(1 for s in _SENT_RE.split(t) if s.strip())
     if count >= min_sents:
         return t
-    additions = [
-        "They framed the weighing early and attempted to collapse the round onto the decisive clashes.",
-        "Comparative analysis connected claims to explicit impacts, although some links could be clearer.",
-        "Time allocation and signposting generally supported flow and judge comprehension."
-    ]
-    while count < min_sents and additions:
-        t = (t + " " + additions.pop(0)).strip()
-        count += 1
+    for addition in _ADDITIONS[:min_sents - count]:
+        t = (t + " " + addition).strip()
     return t
 
-def _overview_fallback(side_name, transcript):
+# Fallback text depends only on the side name, so build it once per process
+@lru_cache(maxsize=4)
+def _overview_fallback(side_name):
     base = (f"The {side_name} team presented a coherent case with clear signposting and "
             "attempted to control the weighing mechanism. They engaged core clashes, "
             "extending key material while addressing opponent pressure. Evidence use was "
@@ -261,6 +442,7 @@ def _overview_fallback(side_name, transcript):
             "and explicit impact calculus tied to feasibility, risk, and timeframe.")
     return _ensure_min_sentences(base, 4)
 
+@lru_cache(maxsize=4)
 def _improvements_fallback(side_name):
     base = (f"{side_name} can improve by tightening comparative weighing earlier, "
             "frontloading the round-winning mechanism, and backing asserted links with a "
@@ -269,30 +451,32 @@ def _improvements_fallback(side_name):
             "making explicit, line-by-line resolution of the main clashes.")
     return _ensure_min_sentences(base, 4)
 
+_MOVE_EXTRA = {
+    "brilliant": " It combined clean warranting with timing that flipped a contested issue. The downstream impact shaped the judge's weighing.",
+    "great": " It advanced the team's win condition with precise comparative work. The explanation connected claim to impact without new matter.",
+    "good": " Solid structure and relevance maintained flow control. A clearer explicit impact link could make it round-deciding.",
+    "inaccuracy": " A factual/comparative slip reduced credibility and opened room for opponent leverage. Correct sourcing and line-by-line precision would fix this.",
+    "blunder": " Dropping or mishandling a critical line ceded weighing to the opponent. Always address the win-condition clash before extending new material.",
+}
+_DEFAULT_MOVE_SEED = "A notable contribution occurred at a pivotal moment."
+# Expansions for an empty seed, built once at import
+_DEFAULT_EXPANDED = {lbl: (_DEFAULT_MOVE_SEED + extra).strip() for lbl, extra in _MOVE_EXTRA.items()}
+
 def _expand_move(label, seed):
-    if label == "brilliant":
-        extra = " It combined clean warranting with timing that flipped a contested issue. The downstream impact shaped the judge's weighing."
-    elif label == "great":
-        extra = " It advanced the team's win condition with precise comparative work. The explanation connected claim to impact without new matter."
-    elif label == "good":
-        extra = " Solid structure and relevance maintained flow control. A clearer explicit impact link could make it round-deciding."
-    elif label == "inaccuracy":
-        extra = " A factual/comparative slip reduced credibility and opened room for opponent leverage. Correct sourcing and line-by-line precision would fix this."
-    else:  # blunder
-        extra = " Dropping or mishandling a critical line ceded weighing to the opponent. Always address the win-condition clash before extending new material."
-    text = (seed or "A notable contribution occurred at a pivotal moment.") + extra
-    return _ensure_min_sentences(text, 2)
+    if not seed and label in _DEFAULT_EXPANDED:
+        return _DEFAULT_EXPANDED[label]
+    extra = _MOVE_EXTRA.get(label, _MOVE_EXTRA["blunder"])
+    # Every extra is two full sentences, so the 2-sentence minimum always holds
+    # and no _ensure_min_sentences pass is needed.
+    return ((seed or _DEFAULT_MOVE_SEED) + extra).strip()
+
+_PAD_MOVE = {"time":"", "label":"good", "explanation":"A generally solid contribution with clear structure and relevance."}
 
 def _assign_speech_slots(moves):
-    # Pad/trim to exactly four
-    while len(moves) < 4:
-        moves.append({"time":"", "label":"good", "explanation":"A generally solid contribution with clear structure and relevance."})
-    if len(moves) > 4:
-        moves = moves[:4]
-    # Assign time slots deterministically
-    for i, m in enumerate(moves):
-        m["time"] = SPEECH_SLOTS[i]
-    return moves
+    # Exactly four moves (trimmed or padded), each stamped with its speech slot, in one
+    # allocation; builds new dicts rather than mutating the caller's list
+    n = len(moves)
+    return [dict(moves[i] if i < n else _PAD_MOVE, time=SPEECH_SLOTS[i]) for i in range(4)]
 
 def ensure_analysis_defaults(result, transcript_text):
     if "analysis" not in result or not isinstance(result["analysis"], dict):
@@ -300,7 +484,7 @@ def ensure_analysis_defaults(result, transcript_text):
     for side in ["affirmative","negative"]:
         blob = result["analysis"].get(side) or {}
         ov = (blob.get("overview") or "").strip()
-        if not ov: ov = _overview_fallback(side.upper(), transcript_text)
+        if not ov: ov = _overview_fallback(side.upper())
         else: ov = _ensure_min_sentences(ov, 4)
         blob["overview"] = ov
 
@@ -356,8 +540,8 @@ def rebalance_notable_moves(result, winner):
         is_winner = (winner != "TIE" and
                      ((winner == "AFFIRMATIVE" and side == "affirmative") or
                       (winner == "NEGATIVE" and side == "negative")))
-        new = force_distribution(moves, want_positive_majority=is_winner)
-        result["analysis"][side]["notable_moves"] = _assign_speech_slots(new)
+        # force_distribution already returns four slot-stamped moves
+        result["analysis"][side]["notable_moves"] = force_distribution(moves, want_positive_majority=is_winner)
 
 def DEFAULT_TRANSCRIPT():
     return """\
@@ -371,8 +555,9 @@ def DEFAULT_TRANSCRIPT():
 [20:00 NEG-Reply] Compares on costs and realism; claims NEG wins on practicality.
 """
 
-def build_user_prompt(transcript_text: str) -> str:
-    return f"""
+# Static rubric + template: sent as the system prefix so it is byte-identical across
+# calls and Ollama can reuse its KV cache; only the transcript message changes.
+RUBRIC_PREFIX = """
 RUBRIC (weights):
 - Substantive speeches: Matter 40, Manner 30, Method 30 (speaker1/2/3 both sides).
 - Reply: Matter 20, Manner 15, Method 15 (comparative only, NO new matter).
@@ -380,122 +565,171 @@ RUBRIC (weights):
 
 REQUIREMENTS:
 - Output STRICT JSON only (no prose).
-- MUST include: meta, scores{{affirmative{{speaker1,2,3,reply}}, negative{{speaker1,2,3,reply}}}}, winner, rationale{{summary, why_winner, key_clashes}}, analysis{{affirmative{{overview, improvements, notable_moves[]}}, negative{{overview, improvements, notable_moves[]}}}}.
+- MUST include: meta, scores{affirmative{speaker1,2,3,reply}, negative{speaker1,2,3,reply}}, winner, rationale{summary, why_winner, key_clashes}, analysis{affirmative{overview, improvements, notable_moves[]}, negative{overview, improvements, notable_moves[]}}.
 - All numeric fields must be within allowed ranges. If any computed value would exceed the cap, set it to the cap.
 - notable_moves: label in ["brilliant","great","good","inaccuracy","blunder"], explanation 2–5 sentences, >=4 items per team, preferably mapped to First/Second/Third/Reply.
 
 FILL THIS EXACT TEMPLATE (replace zeros/strings; keep keys exactly as written):
-{{
-  "meta": {{
+{
+  "meta": {
     "format": "Policy",
     "rules": "No new matter in 3rd speeches; reply is comparative only."
-  }},
-  "scores": {{
-    "affirmative": {{
-      "speaker1": {{"matter": 0, "manner": 0, "method": 0, "notes": ""}},
-      "speaker2": {{"matter": 0, "manner": 0, "method": 0, "notes": ""}},
-      "speaker3": {{"matter": 0, "manner": 0, "method": 0, "notes": ""}},
-      "reply":   {{"matter": 0, "manner": 0, "method": 0, "notes": ""}}
-    }},
-    "negative": {{
-      "speaker1": {{"matter": 0, "manner": 0, "method": 0, "notes": ""}},
-      "speaker2": {{"matter": 0, "manner": 0, "method": 0, "notes": ""}},
-      "speaker3": {{"matter": 0, "manner": 0, "method": 0, "notes": ""}},
-      "reply":   {{"matter": 0, "manner": 0, "method": 0, "notes": ""}}
-    }}
-  }},
+  },
+  "scores": {
+    "affirmative": {
+      "speaker1": {"matter": 0, "manner": 0, "method": 0, "notes": ""},
+      "speaker2": {"matter": 0, "manner": 0, "method": 0, "notes": ""},
+      "speaker3": {"matter": 0, "manner": 0, "method": 0, "notes": ""},
+      "reply":   {"matter": 0, "manner": 0, "method": 0, "notes": ""}
+    },
+    "negative": {
+      "speaker1": {"matter": 0, "manner": 0, "method": 0, "notes": ""},
+      "speaker2": {"matter": 0, "manner": 0, "method": 0, "notes": ""},
+      "speaker3": {"matter": 0, "manner": 0, "method": 0, "notes": ""},
+      "reply":   {"matter": 0, "manner": 0, "method": 0, "notes": ""}
+    }
+  },
   "winner": "AFFIRMATIVE",
-  "rationale": {{
+  "rationale": {
     "summary": "",
     "why_winner": "",
     "key_clashes": ["", "", ""]
-  }},
-  "analysis": {{
-    "affirmative": {{
+  },
+  "analysis": {
+    "affirmative": {
       "overview": "",
       "improvements": "",
-      "notable_moves": [{{"time":"", "label":"good", "explanation":""}}]
-    }},
-    "negative": {{
+      "notable_moves": [{"time":"", "label":"good", "explanation":""}]
+    },
+    "negative": {
       "overview": "",
       "improvements": "",
-      "notable_moves": [{{"time":"", "label":"good", "explanation":""}}]
-    }}
-  }}
-}}
+      "notable_moves": [{"time":"", "label":"good", "explanation":""}]
+    }
+  }
+}
+""".strip()
 
+def build_user_prompt(transcript_text: str) -> str:
+    return f"""
 TRANSCRIPT:
 {transcript_text}
 
 Return ONLY the completed JSON object. Do not add any text before or after it.
 """.strip()
 
-# ---------- MAIN ----------
-def main():
-    parser = argparse.ArgumentParser(description="Debate judge using Ollama deepseek-r1")
-    parser.add_argument("--transcript", type=str, default=None,
-                        help="Path to a transcript .txt. If omitted, uses demo transcript.")
-    parser.add_argument("--debug", action="store_true", help="Print debug counts for notable moves")
-    args = parser.parse_args()
+# ---------- RESULT CACHE ----------
+# Finished results keyed by SHA-256 of everything that shapes them: cache version, model,
+# generate options and the full messages (system prefix, rubric, transcript). Stored as
+# JSON, not pickle, in a private (0700, owner-checked) directory under the shared temp dir.
+def _cache_key(messages):
+    material = [RESULT_CACHE_VERSION, MODEL, _GENERATE_OPTIONS, messages]
+    return hashlib.sha256(orjson.dumps(material, option=orjson.OPT_SORT_KEYS)).hexdigest()
 
-    if args.transcript:
-        try:
-            with open(args.transcript, "r", encoding="utf-8") as f:
-                transcript_text = f.read()
-        except FileNotFoundError:
-            print(f"Transcript not found: {args.transcript}")
+def _cache_dir_ok():
+    # Only trust a real directory we own that nobody else can write into
+    try:
+        os.makedirs(CACHE_DIR, mode=0o700, exist_ok=True)
+        st = os.lstat(CACHE_DIR)
+        if not stat.S_ISDIR(st.st_mode):
+            return False
+        if hasattr(os, "getuid"):
+            if st.st_uid != os.getuid():
+                return False
+            if st.st_mode & 0o077:
+                os.chmod(CACHE_DIR, 0o700)
+    except OSError:
+        return False
+    return True
+
+def cache_get(key):
+    if not _cache_dir_ok():
+        return None
+    path = os.path.join(CACHE_DIR, key + ".json")
+    try:
+        with open(path, "rb") as f:
+            result = orjson.loads(f.read())
+        os.utime(path)  # mark as recently used for the LRU sweep
+    except (OSError, ValueError):
+        return None
+    return result
+
+def cache_put(key, result):
+    if not _cache_dir_ok():
+        return
+    tmp = None
+    try:
+        fd, tmp = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(orjson.dumps(result))  # TypeError on e.g. an int beyond 64 bits
+        os.replace(tmp, os.path.join(CACHE_DIR, key + ".json"))  # atomic: readers never see a partial file
+    except (OSError, TypeError):
+        if tmp is not None:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+        return
+    _cache_sweep()
+
+def _cache_sweep():
+    try:
+        entries = [e for e in os.scandir(CACHE_DIR) if e.name.endswith(".json")]
+        if len(entries) <= CACHE_MAX_ENTRIES:
             return
-    else:
-        transcript_text = DEFAULT_TRANSCRIPT()
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for e in entries[:len(entries) - CACHE_MAX_ENTRIES]:
+            os.unlink(e.path)
+    except OSError:
+        pass
+
+# ---------- PIPELINE ----------
+SYSTEM = "You are an impartial debate judge. Judge arguments, not identity."
+
+def final_statement_for(totals):
+    aff_total = totals["affirmative"]; neg_total = totals["negative"]
+    aff_scaled = scale_to_100(aff_total); neg_scaled = scale_to_100(neg_total)
+    diff_raw = aff_total - neg_total
+    diff_scaled = round(abs(aff_scaled - neg_scaled), 1)
+    if diff_raw == 0:
+        return f"The round is a TIE. Final (/100): AFF {aff_scaled} - NEG {neg_scaled}."
+    winner_side = "AFFIRMATIVE" if diff_raw > 0 else "NEGATIVE"
+    return (
+        f"Congratulations, Team {winner_side}! You win by {diff_scaled} points ({margin_label(diff_raw)}). "
+        f"Final (/100): AFF {aff_scaled} - NEG {neg_scaled}."
+    )
+
+def _print_debug_counts(result):
+    for side in ["affirmative","negative"]:
+        mv = result["analysis"][side]["notable_moves"]
+        pos = sum(1 for m in mv if m["label"] in {"brilliant","great"})
+        negc = sum(1 for m in mv if m["label"] in {"inaccuracy","blunder"})
+        print(f"[DEBUG {side}] positives={pos}, negatives={negc}, labels={[m['label'] for m in mv]}")
 
+async def _judge_one(transcript_text, client, sem, debug=False, use_cache=True):
     # ----- LOW-CONTENT SHORT-CIRCUIT -----
     if is_low_content(transcript_text):
         result = empty_result()
         totals = {"affirmative": 0, "negative": 0}
         result["totals"] = totals
-
-        aff_scaled = scale_to_100(0)
-        neg_scaled = scale_to_100(0)
-        final_statement = f"The round is a TIE. Final (/100): AFF {aff_scaled} - NEG {neg_scaled}."
-        result["final_statement"] = final_statement
-
-        # Output
-        print(f"Team AFFIRMATIVE: {aff_scaled}/100")
-        print(f"Team NEGATIVE:   {neg_scaled}/100")
-        print(f"Final verdict: {result['final_statement']}")
-
-        print("\n-- Per-Team Analysis --")
-        for side in ["affirmative","negative"]:
-            ta = result.get("analysis", {}).get(side, {})
-            side_name = side.upper()
-            print(f"\n[{side_name}] OVERVIEW:\n{ta.get('overview','(none)')}")
-            print(f"\n[{side_name}] IMPROVEMENTS:\n{ta.get('improvements','(none)')}")
-            moves = ta.get("notable_moves", [])
-            if moves:
-                print(f"\n[{side_name}] NOTABLE MOVES:")
-                for mv in moves:
-                    t = (mv.get("time") or "").strip()
-                    lbl = (mv.get("label") or "good").upper()
-                    exp = mv.get("explanation","").strip()
-                    prefix = f"[{t}] " if t else ""
-                    pretty = lbl
-                    if lbl == "BRILLIANT": pretty = "BRILLIANT MOVE!"
-                    elif lbl == "GREAT":   pretty = "GREAT MOVE!"
-                    elif lbl == "GOOD":    pretty = "GOOD MOVE"
-                    elif lbl == "INACCURACY": pretty = "INACCURACY"
-                    elif lbl == "BLUNDER": pretty = "BLUNDER"
-                    print(f"  - {prefix}{pretty}: {exp}")
-            else:
-                print(f"\n[{side_name}] NOTABLE MOVES: (none)")
-        return
+        result["final_statement"] = final_statement_for(totals)
+        return result
     # ----- END LOW-CONTENT -----
 
-    SYSTEM = "You are an impartial debate judge. Judge arguments, not identity."
-    user_prompt = build_user_prompt(transcript_text)
-    messages = [{"role":"system","content": SYSTEM},{"role":"user","content": user_prompt}]
+    messages = [{"role":"system","content": SYSTEM + "\n\n" + RUBRIC_PREFIX},
+                {"role":"user","content": build_user_prompt(transcript_text)}]
+
+    key = _cache_key(messages) if use_cache else None
+    if key:
+        cached = cache_get(key)
+        if cached is not None:
+            if debug:
+                _print_debug_counts(cached)
+            return cached
 
     # 1) Call model
-    result = chat_ollama(messages, json_mode=True)
+    async with sem:
+        result = await chat_ollama(messages, client, json_mode=True)
 
     # 2) Clamp numeric ranges
     result = enforce_ranges(result)
@@ -503,13 +737,15 @@ def main():
     # 3) Ensure rich analysis BEFORE validation
     result = ensure_analysis_defaults(result, transcript_text)
 
-    # 4) Validate (retry once)
+    # 4) Validate (retry once, from the failing section; earlier sections already passed)
     try:
-        validate(instance=result, schema=JUDGE_SCHEMA)
-    except ValidationError:
+        _validate_judge(result)
+    except JudgeValidationError as e:
+        if e.section not in _REPAIRABLE:
+            raise  # meta/winner/rationale are untouched by the enforcers
         result = enforce_ranges(result)
         result = ensure_analysis_defaults(result, transcript_text)
-        validate(instance=result, schema=JUDGE_SCHEMA)
+        _validate_judge(result, start=e.section)
 
     # 5) Totals & tie-break
     totals = compute_totals(result)
@@ -523,29 +759,42 @@ def main():
     rebalance_notable_moves(result, result.get("winner","TIE"))
 
     # Optional debug counts
-    if args.debug:
-        for side in ["affirmative","negative"]:
-            mv = result["analysis"][side]["notable_moves"]
-            pos = sum(1 for m in mv if m["label"] in {"brilliant","great"})
-            negc = sum(1 for m in mv if m["label"] in {"inaccuracy","blunder"})
-            print(f"[DEBUG {side}] positives={pos}, negatives={negc}, labels={[m['label'] for m in mv]}")
-
-    # 7) Final statement & print ONLY /100 scores
-    aff_total = totals["affirmative"]; neg_total = totals["negative"]
-    aff_scaled = scale_to_100(aff_total); neg_scaled = scale_to_100(neg_total)
-    diff_raw = aff_total - neg_total
-    diff_scaled = round(abs(aff_scaled - neg_scaled), 1)
-    if diff_raw == 0:
-        final_statement = f"The round is a TIE. Final (/100): AFF {aff_scaled} - NEG {neg_scaled}."
-    else:
-        winner_side = "AFFIRMATIVE" if diff_raw > 0 else "NEGATIVE"
-        final_statement = (
-            f"Congratulations, Team {winner_side}! You win by {diff_scaled} points ({margin_label(diff_raw)}). "
-            f"Final (/100): AFF {aff_scaled} - NEG {neg_scaled}."
-        )
-    result["final_statement"] = final_statement
+    if debug:
+        _print_debug_counts(result)
 
-    # ---- OUTPUT ----
+    # 7) Final statement
+    result["final_statement"] = final_statement_for(totals)
+    if key:
+        cache_put(key, result)
+    return result
+
+def make_client():
+    return AsyncClient(host=OLLAMA_URL, timeout=TIMEOUT, limits=POOL_LIMITS)
+
+async def judge_many(transcripts, debug=False, return_exceptions=False, use_cache=True, client=None):
+    """
+    Judge several transcripts concurrently over one pooled AsyncClient.
+    At most NUM_PARALLEL model calls are in flight (OLLAMA_NUM_PARALLEL, default 4);
+    the rest wait here rather than in the server queue, where they would time out.
+    Long-running callers can pass their own make_client() to keep connections warm
+    across calls; otherwise a client is created and closed here.
+    """
+    if client is None:
+        async with make_client() as own:
+            return await judge_many(transcripts, debug=debug, return_exceptions=return_exceptions,
+                                    use_cache=use_cache, client=own)
+    sem = asyncio.Semaphore(NUM_PARALLEL)
+    tasks = [_judge_one(t, client, sem, debug=debug, use_cache=use_cache) for t in transcripts]
+    return await asyncio.gather(*tasks, return_exceptions=return_exceptions)
+
+def judge(transcript_text, debug=False, use_cache=True):
+    """Sync wrapper for a single transcript."""
+    return asyncio.run(judge_many([transcript_text], debug=debug, use_cache=use_cache))[0]
+
+def print_result(result):
+    # Print ONLY /100 scores
+    totals = result["totals"]
+    aff_scaled = scale_to_100(totals["affirmative"]); neg_scaled = scale_to_100(totals["negative"])
     print(f"Team AFFIRMATIVE: {aff_scaled}/100")
     print(f"Team NEGATIVE:   {neg_scaled}/100")
     print(f"Final verdict: {result['final_statement']}")
@@ -574,6 +823,48 @@ def main():
         else:
             print(f"\n[{side_name}] NOTABLE MOVES: (none)")
 
+# ---------- MAIN ----------
+def main():
+    parser = argparse.ArgumentParser(description="Debate judge using Ollama deepseek-r1")
+    parser.add_argument("--transcript", type=str, default=None,
+                        help="Path to a transcript .txt. If omitted, uses demo transcript.")
+    parser.add_argument("--batch-dir", type=str, default=None,
+                        help="Judge every .txt transcript in this directory concurrently.")
+    parser.add_argument("--debug", action="store_true", help="Print debug counts for notable moves")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore cached results and re-judge")
+    args = parser.parse_args()
+
+    if args.batch_dir:
+        paths = sorted(glob.glob(os.path.join(args.batch_dir, "*.txt")))
+        if not paths:
+            print(f"No .txt transcripts found in: {args.batch_dir}")
+            return
+        transcripts = []
+        for path in paths:
+            with open(path, "r", encoding="utf-8") as f:
+                transcripts.append(f.read())
+        results = asyncio.run(judge_many(transcripts, debug=args.debug, return_exceptions=True,
+                                         use_cache=not args.no_cache))
+        for path, result in zip(paths, results):
+            print(f"\n===== {os.path.basename(path)} =====")
+            if isinstance(result, BaseException):
+                print(f"Judging failed: {result}")
+            else:
+                print_result(result)
+        return
+
+    if args.transcript:
+        try:
+            with open(args.transcript, "r", encoding="utf-8") as f:
+                transcript_text = f.read()
+        except FileNotFoundError:
+            print(f"Transcript not found: {args.transcript}")
+            return
+    else:
+        transcript_text = DEFAULT_TRANSCRIPT()
+
+    print_result(judge(transcript_text, debug=args.debug, use_cache=not args.no_cache))
+
 if __name__ == "__main__":
     main()
 # End of judge.py
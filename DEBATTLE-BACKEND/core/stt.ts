@@ -1,11 +1,95 @@
 // core/stt.ts
-import { execFile } from 'node:child_process';
-import { promisify } from 'node:util';
+import { spawn, ChildProcess } from 'node:child_process';
+import readline from 'node:readline';
 import path from 'node:path';
 
-const execFileAsync = promisify(execFile);
 const PY = process.env.PYTHON_BIN || 'python3';
-const STT_SCRIPT = process.env.STT_PY || path.resolve(__dirname, '../..', 'python', 'stt_cli.py');
+const STT_SCRIPT = process.env.STT_PY || path.resolve(__dirname, '../..', 'python', 'stt_slc.py');
+const STT_TIMEOUT_MS = 60_000;
+
+// One long-lived STT worker (stdin/stdout JSONL) so the model stays loaded between calls.
+// Jobs queue here and are sent one at a time once the worker reports ready, so each
+// job's timeout covers only its own transcription (not the queue or model load).
+type Job = { id: number; input: string; resolve: (out: any) => void; reject: (err: Error) => void };
+
+const queue: Job[] = [];
+let worker: ChildProcess | null = null;
+let ready = false;
+let running: { job: Job; timer: NodeJS.Timeout } | null = null;
+let nextId = 1;
+
+function spawnWorker() {
+  const proc = spawn(PY, [STT_SCRIPT, '--worker'], { stdio: ['pipe', 'pipe', 'inherit'] });
+  worker = proc;
+  ready = false;
+  proc.stdin!.on('error', () => { /* reported via 'exit' */ });
+
+  readline.createInterface({ input: proc.stdout! }).on('line', (line) => {
+    if (worker !== proc) return;
+    let out: any;
+    try { out = JSON.parse(line); } catch { return; }
+    if (typeof out !== 'object' || out === null) return;  // stray non-JSONL output
+    if ('ready' in out) {
+      ready = true;
+      pump();
+      return;
+    }
+    if (!running || out.id !== running.job.id) return;
+    const { job, timer } = running;
+    clearTimeout(timer);
+    running = null;
+    job.resolve(out);
+    pump();
+  });
+
+  const onGone = (err: Error) => {
+    if (worker !== proc) return;  // already replaced (e.g. after a timeout)
+    const wasReady = ready;
+    worker = null;
+    ready = false;
+    if (running) {
+      clearTimeout(running.timer);
+      running.job.reject(err);
+      running = null;
+    }
+    if (!wasReady) {
+      // Died during startup: fail what is queued instead of respawning in a loop
+      for (const job of queue.splice(0)) job.reject(err);
+      return;
+    }
+    pump();
+  };
+  proc.on('error', (e) => onGone(new Error(`STT worker failed: ${e.message}`)));
+  proc.on('exit', (code) => onGone(new Error(`STT worker exited (code ${code})`)));
+}
+
+function pump() {
+  if (running || queue.length === 0) return;
+  if (!worker) { spawnWorker(); return; }
+  if (!ready) return;
+
+  const job = queue.shift()!;
+  const timer = setTimeout(() => {
+    if (!running || running.job !== job) return;
+    running = null;
+    job.reject(new Error('STT timed out'));
+    // The worker is stuck on this job: replace it; queued jobs go to the new one
+    const stuck = worker;
+    worker = null;
+    ready = false;
+    stuck?.kill();
+    pump();
+  }, STT_TIMEOUT_MS);
+  running = { job, timer };
+  worker.stdin!.write(JSON.stringify({ id: job.id, in: job.input }) + '\n');
+}
+
+function runJob(input: string): Promise<any> {
+  return new Promise((resolve, reject) => {
+    queue.push({ id: nextId++, input, resolve, reject });
+    pump();
+  });
+}
 
 export async function transcribeAudio(input: string): Promise<{ text: string; ms: number }> {
   // If you still want the "text:..." shortcut for tests, keep this:
@@ -15,11 +99,7 @@ export async function transcribeAudio(input: string): Promise<{ text: string; ms
     return { text, ms };
   }
 
-  const { stdout } = await execFileAsync(PY, [STT_SCRIPT, '--in', input], { timeout: 60_000 });
-  let out: any;
-  try { out = JSON.parse(stdout); } catch {
-    throw new Error('STT returned non-JSON output');
-  }
+  const out = await runJob(input);
   if (out.error) throw new Error(`STT failed: ${out.error}`);
   return { text: out.text || '', ms: Number(out.ms) || 0 };
 }
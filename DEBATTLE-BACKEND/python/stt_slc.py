@@ -1,43 +1,80 @@
 #!/usr/bin/env python3
-import argparse, json, sys, os, subprocess, tempfile, contextlib, wave
+import argparse, json, sys, os
 
-def duration_ms(wav_path: str) -> int:
+import av  # PyAV: decode/resample in-process (faster-whisper depends on it anyway)
+import numpy as np
+
+RATE = 16000
+
+# Local Whisper via CTranslate2; int8 keeps CPU inference fast and light
+STT_MODEL = os.getenv("STT_MODEL", "base.en")
+STT_DEVICE = os.getenv("STT_DEVICE", "cpu")            # or "cuda"
+STT_COMPUTE = os.getenv("STT_COMPUTE_TYPE", "int8")    # or "float16" on GPU
+
+_MODEL = None
+
+def get_model():
+    # Loaded lazily on first use: model init dominates a cold start
+    global _MODEL
+    if _MODEL is None:
+        from faster_whisper import WhisperModel
+        _MODEL = WhisperModel(STT_MODEL, device=STT_DEVICE, compute_type=STT_COMPUTE)
+    return _MODEL
+
+def load_audio(in_path: str) -> np.ndarray:
+    # 16 kHz mono float32 samples, the layout Whisper consumes directly
+    resampler = av.AudioResampler(format="flt", layout="mono", rate=RATE)
+    chunks = []
+    with av.open(in_path) as container:
+        for frame in container.decode(audio=0):
+            chunks.extend(out.to_ndarray().reshape(-1) for out in resampler.resample(frame))
+        # flush buffered samples
+        chunks.extend(out.to_ndarray().reshape(-1) for out in resampler.resample(None))
+    return np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.float32)
+
+def transcribe(in_path: str) -> dict:
+    audio = load_audio(in_path)
+    segments, info = get_model().transcribe(audio, beam_size=1, vad_filter=True)
+    text = " ".join(s.text.strip() for s in segments).strip()
+    return {"text": text, "ms": int(info.duration * 1000)}
+
+def serve(stream=sys.stdin):
+    # Long-lived worker: one JSON job per line ({"id": ..., "in": path}) in,
+    # one JSON result per line out, with the model kept resident between jobs
     try:
-        with contextlib.closing(wave.open(wav_path, "rb")) as f:
-            frames = f.getnframes()
-            rate = f.getframerate()
-            return int(frames / float(rate) * 1000)
+        get_model()
     except Exception:
-        return 0
-
-def to_wav(in_path: str) -> str:
-    if in_path.lower().endswith(".wav"):
-        return in_path
-    out = tempfile.mktemp(suffix=".wav")
-    # Requires ffmpeg on the box
-    subprocess.run(
-        ["ffmpeg", "-y", "-i", in_path, "-ac", "1", "-ar", "16000", out],
-        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True
-    )
-    return out
+        pass  # surfaced per job below, so the caller still gets a reply
+    # Startup (model load/download) is done; the caller starts job timeouts after this
+    print(json.dumps({"ready": True}), flush=True)
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        job = {}
+        try:
+            job = json.loads(line)
+            out = transcribe(job["in"])
+        except Exception as e:
+            out = {"error": str(e), "text": "", "ms": 0}
+        if isinstance(job, dict) and "id" in job:
+            out["id"] = job["id"]
+        print(json.dumps(out), flush=True)
 
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument("--in", dest="inp", required=True, help="path to uploaded audio")
+    ap.add_argument("--in", dest="inp", help="path to uploaded audio (one-shot mode)")
+    ap.add_argument("--worker", action="store_true", help="read JSONL jobs from stdin until EOF")
     args = ap.parse_args()
 
-    try:
-        wav = to_wav(args.inp)
+    if args.worker:
+        serve()
+        return
+    if not args.inp:
+        ap.error("one of --in or --worker is required")
 
-        import speech_recognition as sr
-        r = sr.Recognizer()
-        with sr.AudioFile(wav) as src:
-            audio = r.record(src)
-
-        # You can swap to r.recognize_whisper_api(...) or any other backend here
-        text = r.recognize_google(audio)
-        ms = duration_ms(wav)
-        print(json.dumps({"text": text, "ms": ms}))
+    try:
+        print(json.dumps(transcribe(args.inp)))
     except Exception as e:
         print(json.dumps({"error": str(e), "text": "", "ms": 0}))
         sys.exit(1)